@@ -0,0 +1,57 @@
+import re
+import unicodedata
+
+try:
+    import ahocorasick
+except ImportError:  # pure-Python environments fall back to the compiled regex
+    ahocorasick = None
+
+# Crisis intervention keywords, most frequently seen first
+# with the rare multi-word phrases last
+CRISIS_KEYWORDS = (
+    'hopeless', 'worthless', 'nothing matters', 'can\'t go on', 'want to die',
+    'suicide', 'kill myself', 'hurt myself', 'self harm', 'self-harm',
+    'end it all', 'end my life', 'no point living', 'better off dead',
+    'overdose', 'everyone would be better without me'
+)
+
+# Typographic apostrophes folded to ASCII so "can’t go on" still matches
+_APOSTROPHES = str.maketrans({'\u2018': "'", '\u2019': "'", '\u02bc': "'"})
+
+def _normalize(text: str) -> str:
+    """Fold compatibility forms, case and diacritics so variants match the plain keywords."""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text).casefold()
+    return "".join(c for c in text if not unicodedata.combining(c)).translate(_APOSTROPHES)
+
+# Keywords in normalized form, so matching costs a single pass over the message
+_CRISIS_TERMS = tuple(_normalize(keyword) for keyword in CRISIS_KEYWORDS)
+
+def _build_crisis_pattern() -> re.Pattern:
+    """Compile the normalized crisis keywords into one alternation."""
+    # No word boundaries: keywords also match inside words ("hopelessness")
+    return re.compile("|".join(re.escape(term) for term in _CRISIS_TERMS))
+
+_CRISIS_RE = _build_crisis_pattern()
+
+# Aho-Corasick automaton over the normalized keywords, when pyahocorasick is installed
+if ahocorasick is not None:
+    _CRISIS_AUTOMATON = ahocorasick.Automaton()
+    for _term in _CRISIS_TERMS:
+        _CRISIS_AUTOMATON.add_word(_term, _term)
+    _CRISIS_AUTOMATON.make_automaton()
+    del _term
+else:
+    _CRISIS_AUTOMATON = None
+
+def has_crisis_keyword(message: str) -> bool:
+    """Return True if any crisis keyword occurs in the normalized message."""
+    message = _normalize(message)
+    if _CRISIS_AUTOMATON is not None:
+        return next(_CRISIS_AUTOMATON.iter(message), None) is not None
+    return _CRISIS_RE.search(message) is not None
+
+def is_crisis_entry(mood_label: str, mood_reason: str) -> bool:
+    """Return True if a mood entry's label or reason contains crisis language."""
+    return has_crisis_keyword(mood_label + " " + mood_reason)
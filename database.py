@@ -1,13 +1,159 @@
 import sqlite3
 import os
-from typing import List, Tuple, Dict, Any
+import re
+import json
+import atexit
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import List, Tuple, Dict, Any, Iterator, Optional
 from datetime import datetime
+from crisis import is_crisis_entry
 
 DATABASE_NAME = "mood_data.db"
 
-def init_database():
-    """Initialize the SQLite database with the mood_logs table."""
-    conn = sqlite3.connect(DATABASE_NAME)
+# Shared connection, opened lazily and reused across calls
+_CONN = None
+_LOCK = threading.Lock()
+
+# Rows pulled per fetch when streaming results
+_FETCH_BATCH_SIZE = 256
+
+# WAL lets readers proceed during writes and halves fsyncs per commit;
+# journal_mode persists in the file, the rest are per-connection settings
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+def _get_conn() -> sqlite3.Connection:
+    """Return the shared SQLite connection, opening it on first use."""
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect(DATABASE_NAME, check_same_thread=False, isolation_level=None, cached_statements=256)
+        for pragma in _PRAGMAS:
+            _CONN.execute(pragma)
+    return _CONN
+
+def _close_conn():
+    """Close the shared SQLite connection if it is open."""
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+atexit.register(_close_conn)
+
+def _rollback(conn: sqlite3.Connection):
+    """Roll back an explicit transaction left open by a failed statement or COMMIT."""
+    # Without this the autocommit connection would fold every later write into it
+    if conn.in_transaction:
+        conn.execute('ROLLBACK')
+
+# Mood polarity keywords used for trend scoring (matched as substrings)
+_POS_RE = re.compile(r'happy|joyful|excited|content|peaceful|grateful', re.IGNORECASE)
+_NEG_RE = re.compile(r'sad|depressed|anxious|stressed|angry|frustrated|worried', re.IGNORECASE)
+
+# analyze_mood_patterns results keyed by (latest entry id, data version, entry_count);
+# new entries advance the id, deletes and restores bump the version and clear it
+_PATTERN_CACHE = {}
+_PATTERN_CACHE_SIZE = 32
+
+# Bumped whenever rows are removed or replaced, which MAX(id) alone cannot reveal
+_DATA_VERSION = 0
+
+def _copy_patterns(patterns: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cached pattern analysis so callers cannot mutate the cached one."""
+    copied = dict(patterns)
+    for key in ('common_categories', 'mood_distribution', 'category_distribution'):
+        if key in copied:
+            copied[key] = copied[key].copy()
+    return copied
+
+def _invalidate_caches():
+    """Drop cached analyses and bump the data version; call with _LOCK held."""
+    global _DATA_VERSION
+    _PATTERN_CACHE.clear()
+    _DATA_VERSION += 1
+
+# Background writer that coalesces queued agent-response updates into one transaction
+_WRITE_Q = queue.Queue()
+_WRITER = None
+_WRITE_BATCH_SIZE = 100
+_WRITE_BATCH_WINDOW = 0.05  # seconds
+
+def _write_worker():
+    """Drain queued agent-response updates, committing each batch at once."""
+    while True:
+        items = [_WRITE_Q.get()]
+        deadline = time.monotonic() + _WRITE_BATCH_WINDOW
+        while len(items) < _WRITE_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(_WRITE_Q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        try:
+            # Skip updates whose caller cancelled them; the rest can no longer be cancelled
+            batch = [item for item in items if item[2].set_running_or_notify_cancel()]
+            if batch:
+                _commit_batch(batch)
+        except Exception:
+            # Never let one bad batch kill the writer and strand later futures
+            pass
+        finally:
+            for _ in items:
+                _WRITE_Q.task_done()
+
+def _commit_batch(batch: List[Tuple[int, str, Future]]):
+    """Apply a batch of running agent-response updates in one transaction and settle their futures."""
+    try:
+        with _LOCK:
+            conn = _get_conn()
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                # Per-row execute keeps each caller's rowcount; the commit is the shared cost
+                results = []
+                for entry_id, agent_response, _ in batch:
+                    cursor.execute('''
+                        UPDATE mood_logs
+                        SET agent_response = ?
+                        WHERE id = ?
+                    ''', (agent_response, entry_id))
+                    results.append(cursor.rowcount > 0)
+                cursor.execute('COMMIT')
+            except sqlite3.Error:
+                _rollback(conn)
+                raise
+    except Exception as e:
+        for _, _, future in batch:
+            future.set_exception(e)
+    else:
+        for (_, _, future), success in zip(batch, results):
+            future.set_result(success)
+
+def _flush_writes():
+    """Block until every queued write has been committed."""
+    _WRITE_Q.join()
+
+# Registered after _close_conn so it runs first at exit
+atexit.register(_flush_writes)
+
+def _fts_phrase(text: str) -> str:
+    """Quote user text as an FTS5 prefix phrase so operators in it are not parsed."""
+    return '"' + text.replace('"', '""') + '" *'
+
+def _ensure_schema(conn: sqlite3.Connection):
+    """Create or migrate the mood_logs schema, indexes and full-text index; call with _LOCK held."""
     cursor = conn.cursor()
     
     # Create mood_logs table
@@ -18,15 +164,74 @@ def init_database():
             mood_reason TEXT NOT NULL,
             agent_response TEXT DEFAULT '',
             problem_category TEXT DEFAULT '',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            crisis_flag INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Databases created before crisis_flag existed get the column added,
+    # with existing entries flagged the same way new ones are
+    cursor.execute('PRAGMA table_info(mood_logs)')
+    if 'crisis_flag' not in {column[1] for column in cursor.fetchall()}:
+        cursor.execute('BEGIN')
+        try:
+            cursor.execute('ALTER TABLE mood_logs ADD COLUMN crisis_flag INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('SELECT id, mood_label, mood_reason FROM mood_logs')
+            flagged = [(entry_id,) for entry_id, mood_label, mood_reason in cursor.fetchall()
+                       if is_crisis_entry(mood_label, mood_reason)]
+            cursor.executemany('UPDATE mood_logs SET crisis_flag = 1 WHERE id = ?', flagged)
+            cursor.execute('COMMIT')
+        except sqlite3.Error:
+            _rollback(conn)
+            raise
+    
+    # Indexes for date-range, mood, category and crisis lookups
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON mood_logs(created_at DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mood_label ON mood_logs(mood_label)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category ON mood_logs(problem_category) WHERE problem_category != ''")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_crisis_flag ON mood_logs(id) WHERE crisis_flag = 1')
+    
+    # Full-text index over mood_logs, kept in sync by triggers
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mood_fts'")
+    fts_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS mood_fts USING fts5(
+            mood_label, mood_reason, problem_category,
+            content='mood_logs', content_rowid='id'
         )
     ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS mood_ai AFTER INSERT ON mood_logs BEGIN
+            INSERT INTO mood_fts (rowid, mood_label, mood_reason, problem_category)
+            VALUES (new.id, new.mood_label, new.mood_reason, new.problem_category);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS mood_ad AFTER DELETE ON mood_logs BEGIN
+            INSERT INTO mood_fts (mood_fts, rowid, mood_label, mood_reason, problem_category)
+            VALUES ('delete', old.id, old.mood_label, old.mood_reason, old.problem_category);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS mood_au AFTER UPDATE OF mood_label, mood_reason, problem_category ON mood_logs BEGIN
+            INSERT INTO mood_fts (mood_fts, rowid, mood_label, mood_reason, problem_category)
+            VALUES ('delete', old.id, old.mood_label, old.mood_reason, old.problem_category);
+            INSERT INTO mood_fts (rowid, mood_label, mood_reason, problem_category)
+            VALUES (new.id, new.mood_label, new.mood_reason, new.problem_category);
+        END
+    ''')
+    if not fts_exists:
+        # Index entries logged before the full-text table existed
+        cursor.execute("INSERT INTO mood_fts (mood_fts) VALUES ('rebuild')")
+
+def init_database():
+    """Initialize the SQLite database with the mood_logs table."""
+    with _LOCK:
+        _ensure_schema(_get_conn())
     
-    conn.commit()
-    conn.close()
     print(f"Database '{DATABASE_NAME}' initialized successfully.")
 
-def log_mood_entry(mood_label: str, mood_reason: str, problem_category: str = "", agent_response: str = "") -> int:
+def log_mood_entry(mood_label: str, mood_reason: str, problem_category: str = "", agent_response: str = "", crisis_flag: Optional[bool] = None) -> int:
     """
     Log a new mood entry to the database.
     
@@ -35,21 +240,25 @@ def log_mood_entry(mood_label: str, mood_reason: str, problem_category: str = ""
         mood_reason: Description of why they feel this way
         problem_category: Category of the problem (e.g., "work", "relationships")
         agent_response: The agent's response to this entry
+        crisis_flag: Whether crisis indicators were detected in this entry;
+                     detected from the label and reason when None
     
     Returns:
         The ID of the newly created entry
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    if crisis_flag is None:
+        crisis_flag = is_crisis_entry(mood_label, mood_reason)
     
-    cursor.execute('''
-        INSERT INTO mood_logs (mood_label, mood_reason, agent_response, problem_category)
-        VALUES (?, ?, ?, ?)
-    ''', (mood_label, mood_reason, agent_response, problem_category))
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            INSERT INTO mood_logs (mood_label, mood_reason, agent_response, problem_category, crisis_flag)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (mood_label, mood_reason, agent_response, problem_category, int(crisis_flag)))
     
-    entry_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        entry_id = cursor.lastrowid
     
     return entry_id
 
@@ -63,18 +272,18 @@ def get_recent_entries(days: int = 7) -> List[Tuple]:
     Returns:
         List of tuples containing mood entry data
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
-        FROM mood_logs
-        WHERE created_at >= datetime('now', '-{} days')
-        ORDER BY created_at DESC
-    '''.format(days))
+        cursor.execute('''
+            SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+            FROM mood_logs
+            WHERE created_at >= datetime('now', ?)
+            ORDER BY created_at DESC
+        ''', (f'-{int(days)} days',))
     
-    entries = cursor.fetchall()
-    conn.close()
+        entries = cursor.fetchall()
     
     return entries
 
@@ -88,41 +297,91 @@ def get_entries_by_count(count: int = 10) -> List[Tuple]:
     Returns:
         List of tuples containing mood entry data
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
-        FROM mood_logs
-        ORDER BY id DESC
-        LIMIT ?
-    ''', (count,))
+        cursor.execute('''
+            SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+            FROM mood_logs
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (count,))
     
-    entries = cursor.fetchall()
-    conn.close()
+        entries = cursor.fetchall()
     
     return entries
 
-def get_all_entries() -> List[Tuple]:
+def get_latest_entry_id() -> Optional[int]:
     """
-    Get all mood entries from the database.
+    Get the ID of the most recently logged mood entry.
     
     Returns:
-        List of tuples containing all mood entry data
+        The highest entry ID, or None if the database is empty
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
-        FROM mood_logs
-        ORDER BY created_at DESC
-    ''')
+        cursor.execute('SELECT MAX(id) FROM mood_logs')
+        latest_id = cursor.fetchone()[0]
     
-    entries = cursor.fetchall()
-    conn.close()
+    return latest_id
+
+def get_data_version() -> int:
+    """
+    Get a counter that changes whenever entries are deleted or the database is restored.
     
-    return entries
+    Returns:
+        The current data version, for use alongside the latest entry ID as a cache key
+    """
+    return _DATA_VERSION
+
+def has_crisis_entry_since(entry_id: int) -> bool:
+    """
+    Check whether any entry from a given ID onwards was flagged for crisis indicators.
+    
+    Args:
+        entry_id: Oldest entry ID to consider
+    
+    Returns:
+        True if a flagged entry exists, False otherwise
+    """
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            SELECT 1 FROM mood_logs
+            WHERE crisis_flag = 1 AND id >= ?
+            LIMIT 1
+        ''', (entry_id,))
+        flagged = cursor.fetchone() is not None
+    
+    return flagged
+
+def get_all_entries() -> Iterator[Tuple]:
+    """
+    Stream all mood entries from the database.
+    
+    Returns:
+        Iterator of tuples containing all mood entry data, fetched in batches
+    """
+    with _LOCK:
+        cursor = _get_conn().cursor()
+        cursor.execute('''
+            SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+            FROM mood_logs
+            ORDER BY created_at DESC
+        ''')
+    
+    # Hold the lock per batch only, never while the caller is consuming rows
+    while True:
+        with _LOCK:
+            batch = cursor.fetchmany(_FETCH_BATCH_SIZE)
+        if not batch:
+            break
+        yield from batch
 
 def update_agent_response(entry_id: int, agent_response: str) -> bool:
     """
@@ -135,34 +394,65 @@ def update_agent_response(entry_id: int, agent_response: str) -> bool:
     Returns:
         True if update was successful, False otherwise
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        UPDATE mood_logs
-        SET agent_response = ?
-        WHERE id = ?
-    ''', (agent_response, entry_id))
+        cursor.execute('''
+            UPDATE mood_logs
+            SET agent_response = ?
+            WHERE id = ?
+        ''', (agent_response, entry_id))
     
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+        success = cursor.rowcount > 0
     
     return success
 
-def analyze_mood_patterns(entry_count: int = 7) -> Dict[str, Any]:
+def queue_agent_response(entry_id: int, agent_response: str) -> Future:
     """
-    Analyze mood patterns from recent entries.
+    Queue an agent response update to be committed with other pending updates.
     
     Args:
-        entry_count: Number of recent entries to analyze
+        entry_id: ID of the mood entry to update
+        agent_response: The agent's response to store
     
     Returns:
-        Dictionary containing mood pattern analysis
+        Future resolving to True if the entry was updated, False otherwise
     """
-    entries = get_entries_by_count(entry_count)
+    global _WRITER
+    with _LOCK:
+        if _WRITER is None:
+            _WRITER = threading.Thread(target=_write_worker, name="mood-writer", daemon=True)
+            _WRITER.start()
+    
+    future = Future()
+    _WRITE_Q.put((entry_id, agent_response, future))
     
-    if not entries:
+    return future
+
+def _mood_trend(mood_labels: List[str]) -> str:
+    """Compare mood positivity of the latest three entries against the three before them."""
+    def mood_score(moods):
+        score = 0
+        for mood in moods:
+            if _POS_RE.search(mood):
+                score += 1
+            elif _NEG_RE.search(mood):
+                score -= 1
+        return score
+    
+    recent_score = mood_score(mood_labels[:3])  # Last 3 entries
+    older_score = mood_score(mood_labels[3:6])
+    
+    if recent_score > older_score:
+        return "improving"
+    elif recent_score < older_score:
+        return "concerning - may need additional support"
+    return "stable"
+
+def _patterns_from_rows(rows: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Build the pattern analysis from (mood_label, problem_category) rows, newest first."""
+    if not rows:
         return {
             'most_common_mood': None,
             'common_categories': [],
@@ -170,83 +460,170 @@ def analyze_mood_patterns(entry_count: int = 7) -> Dict[str, Any]:
             'total_entries': 0
         }
     
-    # Extract mood labels and categories
-    mood_labels = [entry[1] for entry in entries]
-    categories = [entry[4] for entry in entries if entry[4]]
+    # Counter keeps first-seen order on ties, so the most recent entry wins them
+    mood_labels = [mood_label for mood_label, _ in rows]
+    mood_counts = Counter(mood_labels)
+    category_counts = Counter(category for _, category in rows if category)
     
-    # Find most common mood
-    mood_counts = {}
-    for mood in mood_labels:
-        mood_counts[mood] = mood_counts.get(mood, 0) + 1
+    return {
+        'most_common_mood': mood_counts.most_common(1)[0][0],
+        'common_categories': [category for category, _ in category_counts.most_common(3)],
+        'mood_trend': _mood_trend(mood_labels),
+        'total_entries': len(rows),
+        'mood_distribution': dict(mood_counts.most_common()),
+        'category_distribution': dict(category_counts.most_common())
+    }
+
+def analyze_mood_patterns(entry_count: int = 7) -> Dict[str, Any]:
+    """
+    Analyze mood patterns from recent entries.
     
-    most_common_mood = max(mood_counts, key=mood_counts.get) if mood_counts else None
+    Args:
+        entry_count: Number of recent entries to analyze
     
-    # Find common categories
-    category_counts = {}
-    for category in categories:
-        if category:
-            category_counts[category] = category_counts.get(category, 0) + 1
+    Returns:
+        Dictionary containing mood pattern analysis
+    """
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        cursor.execute('SELECT MAX(id) FROM mood_logs')
+        cache_key = (cursor.fetchone()[0], _DATA_VERSION, entry_count)
+        if cache_key in _PATTERN_CACHE:
+            return _copy_patterns(_PATTERN_CACHE[cache_key])
+    
+        # Only the two columns the analysis needs, for the whole window in one query
+        cursor.execute('''
+            SELECT mood_label, problem_category
+            FROM mood_logs
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (entry_count,))
+        patterns = _patterns_from_rows(cursor.fetchall())
+    
+        if patterns['total_entries']:
+            if len(_PATTERN_CACHE) >= _PATTERN_CACHE_SIZE:
+                _PATTERN_CACHE.pop(next(iter(_PATTERN_CACHE)))
+            _PATTERN_CACHE[cache_key] = patterns
+    
+    return _copy_patterns(patterns)
+
+def get_entries_and_patterns(count: int = 7) -> Tuple[List[Tuple], Dict[str, Any]]:
+    """
+    Get the most recent N mood entries together with their pattern analysis.
     
-    common_categories = sorted(category_counts.keys(), key=lambda x: category_counts[x], reverse=True)[:3]
+    Reads the rows once under a single lock hold, so the entries and the
+    analysis always describe the same window.
     
-    # Simple trend analysis (based on mood positivity)
-    positive_moods = ['happy', 'joyful', 'excited', 'content', 'peaceful', 'grateful']
-    negative_moods = ['sad', 'depressed', 'anxious', 'stressed', 'angry', 'frustrated', 'worried']
+    Args:
+        count: Number of recent entries to retrieve and analyze
     
-    recent_moods = mood_labels[:3]  # Last 3 entries
-    older_moods = mood_labels[3:6] if len(mood_labels) > 3 else []
+    Returns:
+        Tuple of (list of mood entry tuples, pattern analysis dictionary)
+    """
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    def mood_score(moods):
-        score = 0
-        for mood in moods:
-            mood_lower = mood.lower()
-            if any(pos in mood_lower for pos in positive_moods):
-                score += 1
-            elif any(neg in mood_lower for neg in negative_moods):
-                score -= 1
-        return score
+        cursor.execute('''
+            SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+            FROM mood_logs
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (count,))
     
-    recent_score = mood_score(recent_moods)
-    older_score = mood_score(older_moods) if older_moods else 0
+        entries = cursor.fetchall()
     
-    if recent_score > older_score:
-        trend = "improving"
-    elif recent_score < older_score:
-        trend = "concerning - may need additional support"
-    else:
-        trend = "stable"
+    return entries, _patterns_from_rows([(entry[1], entry[4]) for entry in entries])
+
+def get_window_patterns(count: int = 7) -> Tuple[Optional[int], Dict[str, Any]]:
+    """
+    Analyze the most recent N mood entries without returning their full rows.
     
-    return {
-        'most_common_mood': most_common_mood,
-        'common_categories': common_categories,
-        'mood_trend': trend,
-        'total_entries': len(entries),
-        'mood_distribution': mood_counts,
-        'category_distribution': category_counts
-    }
+    Args:
+        count: Number of recent entries to analyze
+    
+    Returns:
+        Tuple of (oldest entry ID in the window or None if there are no entries,
+        pattern analysis dictionary)
+    """
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            SELECT id, mood_label, problem_category
+            FROM mood_logs
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (count,))
+    
+        rows = cursor.fetchall()
+    
+    oldest_id = rows[-1][0] if rows else None
+    return oldest_id, _patterns_from_rows([(mood_label, category) for _, mood_label, category in rows])
 
 def search_entries_by_mood(mood_label: str) -> List[Tuple]:
     """
     Search for entries with a specific mood label.
     
     Args:
-        mood_label: The mood to search for
+        mood_label: The mood to search for; an empty label matches every entry
     
     Returns:
         List of matching mood entries
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        if not mood_label.strip():
+            # An empty FTS phrase matches nothing; keep the old match-all behaviour
+            cursor.execute('''
+                SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+                FROM mood_logs
+                ORDER BY created_at DESC
+            ''')
+        else:
+            cursor.execute('''
+                SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+                FROM mood_logs
+                WHERE id IN (SELECT rowid FROM mood_fts WHERE mood_fts MATCH ?)
+                ORDER BY created_at DESC
+            ''', ('mood_label : ' + _fts_phrase(mood_label),))
+    
+        entries = cursor.fetchall()
     
-    cursor.execute('''
-        SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
-        FROM mood_logs
-        WHERE mood_label LIKE ?
-        ORDER BY created_at DESC
-    ''', (f'%{mood_label}%',))
+    return entries
+
+def search_entries_fulltext(query: str) -> List[Tuple]:
+    """
+    Full-text search across mood labels, reasons and categories.
     
-    entries = cursor.fetchall()
-    conn.close()
+    Args:
+        query: Words to search for; each word also matches as a prefix
+    
+    Returns:
+        List of matching mood entries, best matches first
+    """
+    terms = ' '.join(_fts_phrase(word) for word in query.split())
+    if not terms:
+        return []
+    
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            SELECT m.id, m.mood_label, m.mood_reason, m.agent_response, m.problem_category, m.created_at
+            FROM mood_fts
+            JOIN mood_logs m ON m.id = mood_fts.rowid
+            WHERE mood_fts MATCH ?
+            ORDER BY mood_fts.rank
+        ''', (terms,))
+    
+        entries = cursor.fetchall()
     
     return entries
 
@@ -260,18 +637,18 @@ def search_entries_by_category(category: str) -> List[Tuple]:
     Returns:
         List of matching mood entries
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
-        FROM mood_logs
-        WHERE problem_category LIKE ?
-        ORDER BY created_at DESC
-    ''', (f'%{category}%',))
+        cursor.execute('''
+            SELECT id, mood_label, mood_reason, agent_response, problem_category, created_at
+            FROM mood_logs
+            WHERE problem_category LIKE ?
+            ORDER BY created_at DESC
+        ''', (f'%{category}%',))
     
-    entries = cursor.fetchall()
-    conn.close()
+        entries = cursor.fetchall()
     
     return entries
 
@@ -282,33 +659,32 @@ def get_database_stats() -> Dict[str, Any]:
     Returns:
         Dictionary containing database statistics
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    # Total entries
-    cursor.execute('SELECT COUNT(*) FROM mood_logs')
-    total_entries = cursor.fetchone()[0]
-    
-    # Most recent entry
-    cursor.execute('SELECT created_at FROM mood_logs ORDER BY created_at DESC LIMIT 1')
-    latest_entry = cursor.fetchone()
-    latest_date = latest_entry[0] if latest_entry else None
-    
-    # Mood distribution
-    cursor.execute('SELECT mood_label, COUNT(*) FROM mood_logs GROUP BY mood_label ORDER BY COUNT(*) DESC')
-    mood_stats = cursor.fetchall()
-    
-    # Category distribution
-    cursor.execute('SELECT problem_category, COUNT(*) FROM mood_logs WHERE problem_category != "" GROUP BY problem_category ORDER BY COUNT(*) DESC')
-    category_stats = cursor.fetchall()
-    
-    conn.close()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+    
+        # Totals and both distributions in one round trip; distributions come back as JSON objects
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM mood_logs),
+                (SELECT MAX(created_at) FROM mood_logs),
+                (SELECT json_group_object(mood_label, n) FROM (
+                    SELECT mood_label, COUNT(*) AS n FROM mood_logs
+                    GROUP BY mood_label ORDER BY n DESC
+                )),
+                (SELECT json_group_object(problem_category, n) FROM (
+                    SELECT problem_category, COUNT(*) AS n FROM mood_logs
+                    WHERE problem_category != ''
+                    GROUP BY problem_category ORDER BY n DESC
+                ))
+        ''')
+        total_entries, latest_date, mood_stats, category_stats = cursor.fetchone()
     
     return {
         'total_entries': total_entries,
         'latest_entry_date': latest_date,
-        'mood_distribution': dict(mood_stats),
-        'category_distribution': dict(category_stats)
+        'mood_distribution': json.loads(mood_stats),
+        'category_distribution': json.loads(category_stats)
     }
 
 def delete_entry(entry_id: int) -> bool:
@@ -321,14 +697,14 @@ def delete_entry(entry_id: int) -> bool:
     Returns:
         True if deletion was successful, False otherwise
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('DELETE FROM mood_logs WHERE id = ?', (entry_id,))
+        cursor.execute('DELETE FROM mood_logs WHERE id = ?', (entry_id,))
     
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+        success = cursor.rowcount > 0
+        _invalidate_caches()
     
     return success
 
@@ -339,15 +715,13 @@ def clear_all_entries() -> int:
     Returns:
         Number of entries deleted
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
     
-    cursor.execute('SELECT COUNT(*) FROM mood_logs')
-    count = cursor.fetchone()[0]
-    
-    cursor.execute('DELETE FROM mood_logs')
-    conn.commit()
-    conn.close()
+        cursor.execute('DELETE FROM mood_logs')
+        count = cursor.rowcount
+        _invalidate_caches()
     
     return count
 
@@ -366,8 +740,13 @@ def backup_database(backup_filename: str = None) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_filename = f"mood_data_backup_{timestamp}.db"
     
-    import shutil
-    shutil.copy2(DATABASE_NAME, backup_filename)
+    # Online backup copies pages from the live connection, WAL included
+    backup_conn = sqlite3.connect(backup_filename)
+    try:
+        with _LOCK:
+            _get_conn().backup(backup_conn)
+    finally:
+        backup_conn.close()
     
     return backup_filename
 
@@ -384,7 +763,12 @@ def restore_database(backup_filename: str) -> bool:
     try:
         import shutil
         if os.path.exists(backup_filename):
-            shutil.copy2(backup_filename, DATABASE_NAME)
+            # Reopen on the restored file and bring an older backup's schema up to date
+            with _LOCK:
+                _close_conn()
+                _invalidate_caches()
+                shutil.copy2(backup_filename, DATABASE_NAME)
+                _ensure_schema(_get_conn())
             return True
         return False
     except Exception:
@@ -406,17 +790,14 @@ def export_to_csv(filename: str = None) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"mood_export_{timestamp}.csv"
     
-    entries = get_all_entries()
-    
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         
         # Write header
         writer.writerow(['ID', 'Mood Label', 'Mood Reason', 'Agent Response', 'Problem Category', 'Created At'])
         
-        # Write data
-        for entry in entries:
-            writer.writerow(entry)
+        # Write data as it streams in rather than materializing it first
+        writer.writerows(get_all_entries())
     
     return filename
 
@@ -435,31 +816,40 @@ def import_from_csv(filename: str) -> int:
     if not os.path.exists(filename):
         return 0
     
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    imported_count = 0
+    rows = []
     
     with open(filename, 'r', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile)
         
         for row in reader:
-            try:
-                cursor.execute('''
-                    INSERT INTO mood_logs (mood_label, mood_reason, agent_response, problem_category)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    row.get('Mood Label', ''),
-                    row.get('Mood Reason', ''),
-                    row.get('Agent Response', ''),
-                    row.get('Problem Category', '')
-                ))
-                imported_count += 1
-            except sqlite3.Error:
+            mood_label = row.get('Mood Label', '')
+            mood_reason = row.get('Mood Reason', '')
+            if mood_label is None or mood_reason is None:
                 continue  # Skip invalid rows
-    
-    conn.commit()
-    conn.close()
+            rows.append((
+                mood_label,
+                mood_reason,
+                row.get('Agent Response') or '',
+                row.get('Problem Category') or '',
+                int(is_crisis_entry(mood_label, mood_reason))
+            ))
+    
+    # One explicit transaction for the whole batch instead of a commit per row
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        try:
+            cursor.executemany('''
+                INSERT INTO mood_logs (mood_label, mood_reason, agent_response, problem_category, crisis_flag)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            cursor.execute('COMMIT')
+        except sqlite3.Error:
+            _rollback(conn)
+            raise
+        imported_count = len(rows)
     
     return imported_count
 
@@ -479,8 +869,20 @@ def populate_sample_data():
         ("Lonely", "Spending too much time alone and missing social connections", "relationships")
     ]
     
-    for mood, reason, category in sample_entries:
-        log_mood_entry(mood, reason, category)
+    with _LOCK:
+        conn = _get_conn()
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        try:
+            cursor.executemany('''
+                INSERT INTO mood_logs (mood_label, mood_reason, problem_category)
+                VALUES (?, ?, ?)
+            ''', sample_entries)
+            cursor.execute('COMMIT')
+        except sqlite3.Error:
+            _rollback(conn)
+            raise
     
     print(f"Added {len(sample_entries)} sample entries to the database.")
 
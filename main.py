@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 import os
-from pydantic import BaseModel
+import asyncio
+import threading
+from pydantic import BaseModel, ValidationError
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
@@ -28,6 +30,9 @@ class WellnessResponse(BaseModel):
 # Initialize the database
 init_database()
 
+# Keep only the most recent messages in the prompt (10 human/assistant turns)
+MAX_HISTORY_MESSAGES = 20
+
 # Initialize Gemini LLM
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash-exp",
@@ -101,7 +106,28 @@ agent_executor = AgentExecutor(
     handle_parsing_errors=True
 )
 
-def start_conversation():
+async def ainput(prompt_text: str = "") -> str:
+    """Read a line from stdin without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def settle(setter, value):
+        if not future.done():
+            setter(value)
+    
+    def read_line():
+        try:
+            line = input(prompt_text)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(settle, future.set_result, line)
+    
+    # Daemon thread so an abandoned prompt never holds up interpreter exit
+    threading.Thread(target=read_line, daemon=True).start()
+    return await future
+
+async def start_conversation():
     """Start the MindWeaver conversation loop"""
     print("\n🌟 Welcome to MindWeaver - Your Personal Mental Wellness Guide 🌟")
     print("I'm here to support you through conversations about your emotions and well-being.")
@@ -111,7 +137,7 @@ def start_conversation():
     
     while True:
         try:
-            user_input = input("You: ").strip()
+            user_input = (await ainput("You: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'bye', 'goodbye']:
                 print("\nMindWeaver: Take care of yourself! Remember, I'm always here when you need support. 💙")
@@ -121,14 +147,19 @@ def start_conversation():
                 continue
                 
             # Process user input through agent
-            response = agent_executor.invoke({
+            response = await agent_executor.ainvoke({
                 "input": user_input,
                 "chat_history": chat_history
             })
             
             # Parse structured response
             try:
-                structured_response = parser.parse(response.get("output", ""))
+                output = response.get("output", "")
+                try:
+                    # Plain JSON output validates directly, skipping the parser's text scan
+                    structured_response = WellnessResponse.model_validate_json(output)
+                except ValidationError:
+                    structured_response = parser.parse(output)
                 
                 # Display response
                 print(f"\nMindWeaver: {structured_response.support_provided}")
@@ -154,19 +185,23 @@ def start_conversation():
                 print(f"\nMindWeaver: {raw_output}")
                 chat_history.append(("human", user_input))
                 chat_history.append(("assistant", raw_output))
+            
+            # Bound prompt size so per-turn latency stays flat
+            if len(chat_history) > MAX_HISTORY_MESSAGES:
+                chat_history[:] = chat_history[-MAX_HISTORY_MESSAGES:]
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             print("\n\nMindWeaver: Session interrupted. Take care! 💙")
             break
         except Exception as e:
             print(f"\nMindWeaver: I apologize, but I encountered an error. Let's try again. How are you feeling right now?")
             print(f"Error details: {str(e)}")
 
-def proactive_check_in():
+async def aproactive_check_in():
     """Proactive weekly check-in based on historical data"""
     try:
         # Query recent history for insights
-        insight_response = agent_executor.invoke({
+        insight_response = await agent_executor.ainvoke({
             "input": "Generate insights from my past week of mood entries and provide a proactive check-in message",
             "chat_history": []
         })
@@ -177,6 +212,10 @@ def proactive_check_in():
     except Exception as e:
         print(f"Error during proactive check-in: {str(e)}")
 
+def proactive_check_in():
+    """Run the proactive weekly check-in from synchronous code"""
+    asyncio.run(aproactive_check_in())
+
 if __name__ == "__main__":
     # Check if API key is configured
     if not os.getenv("GOOGLE_API_KEY"):
@@ -186,4 +225,4 @@ if __name__ == "__main__":
         exit(1)
     
     # Start the conversation
-    start_conversation()
\ No newline at end of file
+    asyncio.run(start_conversation())
\ No newline at end of file
@@ -1,21 +1,89 @@
 from langchain_core.tools import tool
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import re
+import functools
+from crisis import CRISIS_KEYWORDS, has_crisis_keyword
 from database import (
     log_mood_entry, 
     get_recent_entries, 
     get_entries_by_count,
-    analyze_mood_patterns
+    get_latest_entry_id,
+    get_data_version,
+    get_window_patterns,
+    has_crisis_entry_since
 )
 
-# Crisis intervention keywords and resources
-CRISIS_KEYWORDS = [
-    'suicide', 'kill myself', 'end it all', 'no point living', 'want to die',
-    'hurt myself', 'self harm', 'self-harm', 'overdose', 'end my life',
-    'better off dead', 'can\'t go on', 'nothing matters', 'hopeless',
-    'worthless', 'everyone would be better without me'
-]
+# Mood word -> recommendation bucket for recommend_support_tool
+_MOOD_BUCKETS = {
+    'sad': 'low', 'depressed': 'low', 'down': 'low', 'blue': 'low',
+    'anxious': 'anxious', 'stressed': 'anxious', 'worried': 'anxious', 'nervous': 'anxious',
+    'angry': 'angry', 'frustrated': 'angry', 'irritated': 'angry', 'mad': 'angry',
+    'happy': 'positive', 'joyful': 'positive', 'excited': 'positive', 'good': 'positive'
+}
+# When a label mixes buckets, the earlier bucket wins
+_BUCKET_PRIORITY = ('low', 'anxious', 'angry', 'positive')
+
+_BUCKET_RECS = {
+    'low': (
+        "Try the 4-7-8 breathing technique: Inhale for 4, hold for 7, exhale for 8",
+        "Journal prompt: Write about three small things that brought you comfort recently",
+        "Consider a gentle walk outside or some light stretching",
+        "Listen to uplifting music or a guided meditation"
+    ),
+    'anxious': (
+        "Practice grounding: Name 5 things you see, 4 you hear, 3 you touch, 2 you smell, 1 you taste",
+        "Try progressive muscle relaxation starting from your toes",
+        "Deep breathing: Breathe in slowly through your nose, out through your mouth",
+        "Journal prompt: What are three things within your control right now?"
+    ),
+    'angry': (
+        "Try the STOP technique: Stop, Take a breath, Observe, Proceed mindfully",
+        "Physical release: Do jumping jacks, squeeze a stress ball, or punch a pillow",
+        "Journal prompt: What triggered this feeling and what would help resolve it?",
+        "Cool down strategy: Splash cold water on your face or hold an ice cube"
+    ),
+    'positive': (
+        "Savor this moment: Take a mental snapshot of how you feel right now",
+        "Journal prompt: What contributed to this positive feeling?",
+        "Share your joy: Consider telling someone about what's making you happy",
+        "Practice gratitude: Write down three things you're grateful for today"
+    ),
+    'default': (
+        "Take a few minutes for mindful breathing",
+        "Journal about your current thoughts and feelings",
+        "Consider what your body and mind need right now",
+        "Practice self-compassion and be gentle with yourself"
+    )
+}
+
+# Category words are the tip keys themselves, checked in the same priority order
+_CATEGORY_PRIORITY = ('work', 'relationship', 'health')
+
+_CATEGORY_TIPS = {
+    'work': "Work stress tip: Try the Pomodoro technique - 25 minutes focused work, 5 minute break",
+    'relationship': "Relationship tip: Practice 'I feel' statements instead of 'You always/never' statements",
+    'health': "Health anxiety tip: Focus on what you can control - rest, nutrition, and gentle movement"
+}
 
+# Finished recommend_support_tool output per (bucket, category): three bucket
+# recommendations plus the category tip, or four recommendations when there is no tip
+_FINAL_RECS = {
+    (bucket, category): "Here are some personalized recommendations for you:\n" + "\n".join(
+        f"• {rec}" for rec in (recs[:3] + (_CATEGORY_TIPS[category],) if category else recs[:4])
+    )
+    for bucket, recs in _BUCKET_RECS.items()
+    for category in (*_CATEGORY_TIPS, None)
+}
+
+def _build_substring_pattern(words) -> re.Pattern:
+    """Compile words into a lookahead alternation that reports every (overlapping) occurrence."""
+    # Substring semantics: "sadness" and "work_stress" match like the old `in` checks
+    return re.compile("(?=(" + "|".join(re.escape(word) for word in words) + "))")
+
+_MOOD_RE = _build_substring_pattern(_MOOD_BUCKETS)
+_CATEGORY_WORD_RE = _build_substring_pattern(_CATEGORY_PRIORITY)
+
+# Crisis intervention resources
 CRISIS_RESOURCES = {
     "US": {
         "National Suicide Prevention Lifeline": "988",
@@ -28,6 +96,74 @@ CRISIS_RESOURCES = {
     }
 }
 
+_CRISIS_RESPONSE = """
+🚨 IMMEDIATE CRISIS SUPPORT 🚨
+
+I'm very concerned about what you've shared. Your life has value and there are people who want to help you right now.
+
+IMMEDIATE HELP:
+• National Suicide Prevention Lifeline: 988 (US)
+• Crisis Text Line: Text HOME to 741741
+• Emergency Services: 911
+
+INTERNATIONAL:
+• International Association for Suicide Prevention: https://www.iasp.info/resources/Crisis_Centres/
+• Befrienders Worldwide: https://www.befrienders.org/
+
+Please reach out to one of these resources immediately. You don't have to go through this alone.
+
+If you're not in immediate danger but need support, consider:
+• Calling a trusted friend or family member
+• Going to your nearest emergency room
+• Contacting your mental health provider
+
+You matter. Your life matters. Help is available.
+""".strip()
+
+_NO_CRISIS_MSG = "No crisis indicators detected. Continue with normal supportive conversation."
+
+_INSIGHT_CRISIS_NOTE = (
+    "\n\n🚨 Some of these entries mentioned thoughts that concern me. "
+    "If you're struggling, please reach out now:\n"
+    + "\n".join(f"• {name}: {contact}" for name, contact in CRISIS_RESOURCES["US"].items())
+)
+
+# Simulated content suggestions (in a real implementation, this would use web search)
+_CONTENT_LIBRARY = {
+    "anxiety": (
+        "10 Minute Guided Meditation for Anxiety - https://example.com/anxiety-meditation",
+        "Understanding Anxiety: What Your Body Is Telling You - https://example.com/anxiety-guide",
+        "Calming Music Playlist for Stress Relief - https://example.com/calming-music"
+    ),
+    "depression": (
+        "Gentle Yoga for Depression and Low Energy - https://example.com/depression-yoga",
+        "The Science of Depression: You're Not Broken - https://example.com/depression-science",
+        "Uplifting Podcasts for Mental Health - https://example.com/mental-health-podcasts"
+    ),
+    "stress": (
+        "Quick Stress Relief Techniques That Actually Work - https://example.com/stress-relief",
+        "Work-Life Balance: Setting Healthy Boundaries - https://example.com/work-balance",
+        "Progressive Muscle Relaxation Guide - https://example.com/muscle-relaxation"
+    ),
+    "sleep": (
+        "Better Sleep Hygiene: A Complete Guide - https://example.com/sleep-hygiene",
+        "Sleep Stories and Relaxation Techniques - https://example.com/sleep-stories",
+        "Understanding Sleep and Mental Health Connection - https://example.com/sleep-mental-health"
+    )
+}
+
+_DEFAULT_SUGGESTIONS = (
+    "Mindfulness 101: Getting Started - https://example.com/mindfulness-guide",
+    "Self-Care Strategies for Mental Wellness - https://example.com/self-care",
+    "Building Emotional Resilience - https://example.com/resilience"
+)
+
+# Library categories, matched anywhere in the text like the old substring checks
+_CATEGORY_RE = re.compile("|".join(_CONTENT_LIBRARY), re.IGNORECASE)
+
+_LOG_CONFIRMATION = "Mood entry logged successfully (ID: {}). I've recorded that you're feeling {} because {}."
+_REASON_PREVIEW_LEN = 120
+
 @tool
 def mood_logger_tool(mood_label: str, mood_reason: str, problem_category: str = "") -> str:
     """
@@ -42,11 +178,37 @@ def mood_logger_tool(mood_label: str, mood_reason: str, problem_category: str =
         Confirmation message of the logged entry
     """
     try:
+        # log_mood_entry flags crisis language at write time so later reads can skip rescanning
         entry_id = log_mood_entry(mood_label, mood_reason, problem_category)
-        return f"Mood entry logged successfully (ID: {entry_id}). I've recorded that you're feeling {mood_label} because {mood_reason}."
+        # The full reason is in the database; echo back only a preview
+        if len(mood_reason) > _REASON_PREVIEW_LEN:
+            mood_reason = mood_reason[:_REASON_PREVIEW_LEN] + '…'
+        return _LOG_CONFIRMATION.format(entry_id, mood_label, mood_reason)
     except Exception as e:
         return f"Error logging mood entry: {str(e)}"
 
+# Named time periods -> number of recent entries; digits are taken literally
+_PERIOD_COUNTS = {"week": 7, "month": 30}
+
+def _period_count(time_period: str) -> int:
+    """Map a time period ("week", "month" or a number) to an entry count, defaulting to a week."""
+    return _PERIOD_COUNTS.get(time_period.casefold()) or (int(time_period) if time_period.isdigit() else 7)
+
+@functools.lru_cache(maxsize=32)
+def _format_history(count: int, latest_id: Optional[int], data_version: int) -> str:
+    """Format the last `count` entries; `latest_id` and `data_version` key the cache so new, deleted or restored entries miss it."""
+    entries = get_entries_by_count(count)
+    
+    if not entries:
+        return "No mood entries found in your history."
+    
+    # Format entries for analysis
+    lines = [
+        f"{i}. Mood: {entry[1]}, Reason: {entry[2]}, Category: {entry[4] or 'General'}"
+        for i, entry in enumerate(entries, 1)
+    ]
+    return f"Your last {len(entries)} mood entries:\n" + "\n".join(lines) + "\n"
+
 @tool
 def query_history_tool(time_period: str = "week") -> str:
     """
@@ -60,30 +222,39 @@ def query_history_tool(time_period: str = "week") -> str:
         Formatted string of historical mood entries
     """
     try:
-        # Parse time period
-        if time_period.lower() == "week":
-            count = 7
-        elif time_period.lower() == "month":
-            count = 30
-        elif time_period.isdigit():
-            count = int(time_period)
-        else:
-            count = 7  # Default to week
-        
-        entries = get_entries_by_count(count)
-        
-        if not entries:
-            return "No mood entries found in your history."
-        
-        # Format entries for analysis
-        history_text = f"Your last {len(entries)} mood entries:\n"
-        for i, entry in enumerate(entries, 1):
-            history_text += f"{i}. Mood: {entry[1]}, Reason: {entry[2]}, Category: {entry[4] or 'General'}\n"
-        
-        return history_text
+        return _format_history(_period_count(time_period), get_latest_entry_id(), get_data_version())
     except Exception as e:
         return f"Error querying history: {str(e)}"
 
+@functools.lru_cache(maxsize=16)
+def _build_insight(time_period: str, latest_id: Optional[int], data_version: int) -> str:
+    """Build the insight text; `latest_id` and `data_version` key the cache so new, deleted or restored entries miss it."""
+    # Patterns plus the window's oldest id in one read; the rows themselves are never shown
+    oldest_id, patterns = get_window_patterns(_period_count(time_period))
+    
+    if oldest_id is None:
+        return "I don't have enough data yet to provide insights. Let's start by talking about how you're feeling today!"
+    
+    insight = f"Based on your recent {time_period}, here are some patterns I've noticed:\n\n"
+    
+    if patterns['most_common_mood']:
+        insight += f"• Your most frequent mood has been '{patterns['most_common_mood']}'\n"
+    
+    if patterns['common_categories']:
+        insight += f"• Main areas of concern: {', '.join(patterns['common_categories'])}\n"
+    
+    if patterns['mood_trend']:
+        insight += f"• Overall trend: {patterns['mood_trend']}\n"
+    
+    # Add personalized recommendations
+    insight += "\n💡 Based on these patterns, I'd like to explore some coping strategies with you."
+    
+    # Surface crisis resources if any entry in this window was flagged when logged
+    if has_crisis_entry_since(oldest_id):
+        insight += _INSIGHT_CRISIS_NOTE
+    
+    return insight
+
 @tool
 def generate_insight_tool(time_period: str = "week") -> str:
     """
@@ -96,30 +267,7 @@ def generate_insight_tool(time_period: str = "week") -> str:
         Personalized insights and patterns from mood history
     """
     try:
-        # Get historical data
-        history = query_history_tool(time_period)
-        
-        if "No mood entries found" in history:
-            return "I don't have enough data yet to provide insights. Let's start by talking about how you're feeling today!"
-        
-        # Analyze patterns using database function
-        patterns = analyze_mood_patterns(7 if time_period == "week" else 30)
-        
-        insight = f"Based on your recent {time_period}, here are some patterns I've noticed:\n\n"
-        
-        if patterns['most_common_mood']:
-            insight += f"• Your most frequent mood has been '{patterns['most_common_mood']}'\n"
-        
-        if patterns['common_categories']:
-            insight += f"• Main areas of concern: {', '.join(patterns['common_categories'])}\n"
-        
-        if patterns['mood_trend']:
-            insight += f"• Overall trend: {patterns['mood_trend']}\n"
-        
-        # Add personalized recommendations
-        insight += "\n💡 Based on these patterns, I'd like to explore some coping strategies with you."
-        
-        return insight
+        return _build_insight(time_period, get_latest_entry_id(), get_data_version())
     except Exception as e:
         return f"Error generating insights: {str(e)}"
 
@@ -135,60 +283,21 @@ def recommend_support_tool(mood_label: str, problem_category: str = "") -> str:
     Returns:
         Personalized recommendations and coping strategies
     """
-    recommendations = []
-    mood_lower = mood_label.lower()
-    
     # Mood-specific recommendations
-    if any(word in mood_lower for word in ['sad', 'depressed', 'down', 'blue']):
-        recommendations.extend([
-            "Try the 4-7-8 breathing technique: Inhale for 4, hold for 7, exhale for 8",
-            "Journal prompt: Write about three small things that brought you comfort recently",
-            "Consider a gentle walk outside or some light stretching",
-            "Listen to uplifting music or a guided meditation"
-        ])
-    
-    elif any(word in mood_lower for word in ['anxious', 'stressed', 'worried', 'nervous']):
-        recommendations.extend([
-            "Practice grounding: Name 5 things you see, 4 you hear, 3 you touch, 2 you smell, 1 you taste",
-            "Try progressive muscle relaxation starting from your toes",
-            "Deep breathing: Breathe in slowly through your nose, out through your mouth",
-            "Journal prompt: What are three things within your control right now?"
-        ])
-    
-    elif any(word in mood_lower for word in ['angry', 'frustrated', 'irritated', 'mad']):
-        recommendations.extend([
-            "Try the STOP technique: Stop, Take a breath, Observe, Proceed mindfully",
-            "Physical release: Do jumping jacks, squeeze a stress ball, or punch a pillow",
-            "Journal prompt: What triggered this feeling and what would help resolve it?",
-            "Cool down strategy: Splash cold water on your face or hold an ice cube"
-        ])
-    
-    elif any(word in mood_lower for word in ['happy', 'joyful', 'excited', 'good']):
-        recommendations.extend([
-            "Savor this moment: Take a mental snapshot of how you feel right now",
-            "Journal prompt: What contributed to this positive feeling?",
-            "Share your joy: Consider telling someone about what's making you happy",
-            "Practice gratitude: Write down three things you're grateful for today"
-        ])
-    
-    else:
-        # Default recommendations
-        recommendations.extend([
-            "Take a few minutes for mindful breathing",
-            "Journal about your current thoughts and feelings",
-            "Consider what your body and mind need right now",
-            "Practice self-compassion and be gentle with yourself"
-        ])
+    bucket = min(
+        (_MOOD_BUCKETS[word] for word in _MOOD_RE.findall(mood_label.casefold())),
+        key=_BUCKET_PRIORITY.index,
+        default='default'
+    )
     
     # Category-specific recommendations
-    if "work" in problem_category.lower():
-        recommendations.append("Work stress tip: Try the Pomodoro technique - 25 minutes focused work, 5 minute break")
-    elif "relationship" in problem_category.lower():
-        recommendations.append("Relationship tip: Practice 'I feel' statements instead of 'You always/never' statements")
-    elif "health" in problem_category.lower():
-        recommendations.append("Health anxiety tip: Focus on what you can control - rest, nutrition, and gentle movement")
+    category = min(
+        _CATEGORY_WORD_RE.findall(problem_category.casefold()),
+        key=_CATEGORY_PRIORITY.index,
+        default=None
+    )
     
-    return "Here are some personalized recommendations for you:\n" + "\n".join([f"• {rec}" for rec in recommendations[:4]])
+    return _FINAL_RECS[(bucket, category)]
 
 @tool
 def search_content_tool(query: str, mood_context: str = "") -> str:
@@ -202,50 +311,20 @@ def search_content_tool(query: str, mood_context: str = "") -> str:
     Returns:
         Curated content suggestions with links
     """
-    # Simulated content suggestions (in a real implementation, this would use web search)
-    content_library = {
-        "anxiety": [
-            "10 Minute Guided Meditation for Anxiety - https://example.com/anxiety-meditation",
-            "Understanding Anxiety: What Your Body Is Telling You - https://example.com/anxiety-guide",
-            "Calming Music Playlist for Stress Relief - https://example.com/calming-music"
-        ],
-        "depression": [
-            "Gentle Yoga for Depression and Low Energy - https://example.com/depression-yoga",
-            "The Science of Depression: You're Not Broken - https://example.com/depression-science",
-            "Uplifting Podcasts for Mental Health - https://example.com/mental-health-podcasts"
-        ],
-        "stress": [
-            "Quick Stress Relief Techniques That Actually Work - https://example.com/stress-relief",
-            "Work-Life Balance: Setting Healthy Boundaries - https://example.com/work-balance",
-            "Progressive Muscle Relaxation Guide - https://example.com/muscle-relaxation"
-        ],
-        "sleep": [
-            "Better Sleep Hygiene: A Complete Guide - https://example.com/sleep-hygiene",
-            "Sleep Stories and Relaxation Techniques - https://example.com/sleep-stories",
-            "Understanding Sleep and Mental Health Connection - https://example.com/sleep-mental-health"
-        ]
-    }
-    
-    # Find relevant content based on query and mood
-    query_lower = query.lower()
-    mood_lower = mood_context.lower()
-    
-    suggestions = []
+    # Find relevant content based on query and mood in one scan
+    matched = {match.group().casefold() for match in _CATEGORY_RE.finditer(query + " " + mood_context)}
     
-    for category, links in content_library.items():
-        if category in query_lower or category in mood_lower:
-            suggestions.extend(links[:2])  # Limit to 2 per category
+    suggestions = [
+        link
+        for category, links in _CONTENT_LIBRARY.items() if category in matched
+        for link in links[:2]  # Limit to 2 per category
+    ]
     
     if not suggestions:
-        # Default suggestions
-        suggestions = [
-            "Mindfulness 101: Getting Started - https://example.com/mindfulness-guide",
-            "Self-Care Strategies for Mental Wellness - https://example.com/self-care",
-            "Building Emotional Resilience - https://example.com/resilience"
-        ]
+        suggestions = _DEFAULT_SUGGESTIONS
     
     content_text = "Here are some helpful resources I found for you:\n"
-    content_text += "\n".join([f"• {suggestion}" for suggestion in suggestions[:3]])
+    content_text += "\n".join(f"• {suggestion}" for suggestion in suggestions[:3])
     content_text += "\n\nRemember, these are supplementary resources. Professional help is always available if you need it."
     
     return content_text
@@ -261,35 +340,8 @@ def crisis_mode_tool(user_message: str) -> str:
     Returns:
         Crisis intervention response with immediate resources
     """
-    message_lower = user_message.lower()
-    
-    # Check for crisis keywords
-    crisis_detected = any(keyword in message_lower for keyword in CRISIS_KEYWORDS)
-    
-    if crisis_detected:
-        crisis_response = """
-🚨 IMMEDIATE CRISIS SUPPORT 🚨
-
-I'm very concerned about what you've shared. Your life has value and there are people who want to help you right now.
-
-IMMEDIATE HELP:
-• National Suicide Prevention Lifeline: 988 (US)
-• Crisis Text Line: Text HOME to 741741
-• Emergency Services: 911
-
-INTERNATIONAL:
-• International Association for Suicide Prevention: https://www.iasp.info/resources/Crisis_Centres/
-• Befrienders Worldwide: https://www.befrienders.org/
-
-Please reach out to one of these resources immediately. You don't have to go through this alone.
-
-If you're not in immediate danger but need support, consider:
-• Calling a trusted friend or family member
-• Going to your nearest emergency room
-• Contacting your mental health provider
-
-You matter. Your life matters. Help is available.
-        """
-        return crisis_response.strip()
+    # Check for crisis keywords in one pass over the message
+    if has_crisis_keyword(user_message):
+        return _CRISIS_RESPONSE
     
-    return "No crisis indicators detected. Continue with normal supportive conversation."
\ No newline at end of file
+    return _NO_CRISIS_MSG
\ No newline at end of file